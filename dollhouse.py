@@ -1,11 +1,36 @@
 #!/usr/bin/python3
 
-import requests, re, email, psycopg2, os, sys
+import requests, re, email, psycopg2, os, sys, shutil, functools
 import logging, logging.handlers
-import xml.etree.ElementTree as ET
+try:
+	# libxml2-backed parser when available; same API for everything used here
+	from lxml import etree as ET
+	# The feed is remote input: never expand entities or fetch external DTDs
+	_XML_PARSER = ET.XMLParser(resolve_entities=False, no_network=True)
+except ImportError:
+	import xml.etree.ElementTree as ET
+	_XML_PARSER = None  # expat does not load external entities
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pprint import pprint
 from configobj import ConfigObj
+from psycopg2.extras import execute_values
+
+_SE_RE = re.compile(r"(S[0-9]+E[0-9]+)")
+_DATE_RE = re.compile(r"([0-9]{4}(?:\s+|\.)[0-9]{2}(?:\s+|\.)[0-9]{2})")
+_ADDED_RE = re.compile(r"Added: ([0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2})")
+_FILENAME_RE = re.compile(r'filename="(.+)"')
+_QUALITY_RE = re.compile(r'(2160p|1080p|720p)')
+
+_DOWNLOAD_WORKERS = 8
+_INSERT_PAGE_SIZE = 1000
+_ITEM_FIELDS = ('title', 'category', 'link', 'pubDate', 'description')
+_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+@functools.lru_cache(maxsize=256)
+def _parse_pubdate(pubDate):
+	# Items in one feed often share a pubDate; datetimes are immutable, so cache them
+	return datetime.fromtimestamp(email.utils.mktime_tz(email.utils.parsedate_tz(pubDate)))
 
 class DollHouse:
 
@@ -14,15 +39,26 @@ class DollHouse:
 		self.tl_link = config['rss_link']
 		self.database = config['database']
 		self.save_dir = config['save_dir']
+		self.session = requests.Session()
+		adapter = requests.adapters.HTTPAdapter(pool_connections=_DOWNLOAD_WORKERS, pool_maxsize=_DOWNLOAD_WORKERS)
+		self.session.mount('http://', adapter)
+		self.session.mount('https://', adapter)
+		self._cur = None
 
 	def create_connection(self):
 		try:
 			conn = psycopg2.connect(self.database)
 			return conn
-		except Error as e:
+		except psycopg2.Error as e:
 			log.error(e)
 		return None
 
+	def get_cursor(self, conn):
+		# Reuse one cursor per connection instead of allocating one per query
+		if self._cur is None or self._cur.closed or self._cur.connection is not conn:
+			self._cur = conn.cursor()
+		return self._cur
+
 	def setup_logger(self):
 		logger = logging.getLogger('DollHouse')
 		formatter = logging.Formatter(fmt='%(name)s: %(message)s')
@@ -34,63 +70,96 @@ class DollHouse:
 
 	def add_release(self, conn, show):
 		sql = "INSERT INTO releases(title, episode, quality, tags, category, date, link) VALUES(%s, %s, %s, %s, %s, %s, %s) RETURNING id"
-		cur = conn.cursor()
+		cur = self.get_cursor(conn)
 		cur.execute(sql, show)
 		return cur.fetchone()[0]
 
+	def add_releases_many(self, conn, shows):
+		sql = "INSERT INTO releases(title, episode, quality, tags, category, date, link) VALUES %s RETURNING id"
+		cur = self.get_cursor(conn)
+		rows = execute_values(cur, sql, shows, page_size=_INSERT_PAGE_SIZE, fetch=True)
+		return [row[0] for row in rows]
+
 	def add_downloads(self, conn, show):
 		sql = "INSERT INTO downloads(title, episode, release_id) VALUES(%s, %s, %s) RETURNING id"
-		cur = conn.cursor()
+		cur = self.get_cursor(conn)
 		cur.execute(sql, show)
 		return cur.fetchone()[0]
 
+	def add_downloads_many(self, conn, shows):
+		sql = "INSERT INTO downloads(title, episode, release_id) VALUES %s RETURNING id"
+		cur = self.get_cursor(conn)
+		rows = execute_values(cur, sql, shows, page_size=_INSERT_PAGE_SIZE, fetch=True)
+		return [row[0] for row in rows]
+
 	def get_wishlist(self, conn):
-		cur = conn.cursor()
+		cur = self.get_cursor(conn)
 		cur.execute("SELECT title, min_episode, includeprops, excludeprops FROM wishlist")
 		rows = cur.fetchall()
 		return rows
 
 	def check_if_show_exists(self, conn, link):
-		cur = conn.cursor()
+		cur = self.get_cursor(conn)
 		cur.execute("SELECT check_release_exists(%s)", (link,))
 		return cur.fetchone()[0]
 
+	def get_existing_links(self, conn, links):
+		cur = self.get_cursor(conn)
+		cur.execute("SELECT LOWER(link) FROM releases WHERE LOWER(link) = ANY(%s)", ([link.lower() for link in links if link is not None],))
+		return set(row[0] for row in cur.fetchall())
+
 	def check_to_download(self, conn, title, episode):
-		cur = conn.cursor()
+		cur = self.get_cursor(conn)
 		cur.execute("SELECT is_not_downloaded(%s, %s)", (title, episode))
 		return cur.fetchone()[0]
 
 	def download_episode(self, link):
-		req = requests.get(link)
-		filename = re.findall('filename="(.+)"', req.headers['content-disposition'])
-		path = os.path.join(self.save_dir, os.path.basename((filename[0])))
-		f = open(path, 'wb')
-		f.write(req.content)
-		f.close()
+		with self.session.get(link, stream=True) as req:
+			req.raise_for_status()
+			filename = _FILENAME_RE.findall(req.headers['content-disposition'])
+			path = os.path.join(self.save_dir, os.path.basename((filename[0])))
+			req.raw.decode_content = True
+			with open(path, 'wb') as f:
+				shutil.copyfileobj(req.raw, f, length=65536)
 		log.info("Downloaded %s -> %s" % (link, path))
 		return True
 
+	def try_download(self, link):
+		# A failed download is logged and skipped so the rest are still recorded
+		try:
+			return self.download_episode(link)
+		except Exception as e:
+			try:
+				log.error("Download failed %s: %s" % (link, e))
+			except NameError:
+				pass  # log not available in test context
+			return False
+
 	def find_releases(self, conn):
-		cur = conn.cursor()
-		cur.execute("SELECT * FROM find_matching_releases()")
+		cur = self.get_cursor(conn)
+		cur.execute("SELECT release_id, title, episode, link FROM find_matching_releases()")
 		rows = cur.fetchall()
-		
-		for row in rows:
-			# row: (release_id, title, episode, quality, link, tags, wishlist_id)
-			release_id, title, episode, quality, link, tags, wishlist_id = row
-			result = self.download_episode(link)
+
+		with ThreadPoolExecutor(max_workers=_DOWNLOAD_WORKERS) as executor:
+			results = list(executor.map(self.try_download, [row[3] for row in rows]))
+
+		downloaded = []
+		for (release_id, title, episode, link), result in zip(rows, results):
 			if result:
-				show = (title, episode, release_id)
-				download_id = self.add_downloads(conn, show)
-				try:
-					log.info("Marked show as downloaded: %s, %s (release_id: %s)" % (title, episode, download_id))
-				except NameError:
-					pass  # log not available in test context
+				downloaded.append((title, episode, release_id))
+
+		download_ids = self.add_downloads_many(conn, downloaded)
+		for (title, episode, release_id), download_id in zip(downloaded, download_ids):
+			try:
+				log.info("Marked show as downloaded: %s, %s (release_id: %s)" % (title, episode, download_id))
+			except NameError:
+				pass  # log not available in test context
 
 	def get_feed(self):
-		req = requests.get(self.tl_link)
-		log.debug("%s status_code: %s" % (self.tl_link, req.status_code))
-		root = ET.fromstring(req.text.encode('utf-8'))
+		with self.session.get(self.tl_link, stream=True) as req:
+			log.debug("%s status_code: %s" % (self.tl_link, req.status_code))
+			req.raw.decode_content = True
+			root = ET.parse(req.raw, _XML_PARSER).getroot()
 
 		#f = open("rss.xml", "r")
 		#feed = f.read()
@@ -103,73 +172,45 @@ class DollHouse:
 		return items
 
 	def parse_feed(self, feed):
-		shows = []
 		movies = []
 		allshows = []
 
+		# Bind hot callables to locals once rather than resolving them per item
+		parse_pubdate = _parse_pubdate
+		strptime = datetime.strptime
+		split_episode = _SE_RE.split
+		split_date = _DATE_RE.split
+		search_quality = _QUALITY_RE.search
+
+		shows = []
 		for item in feed:
-			title = item.findtext('title')
-			category = item.findtext('category')
-			link = item.findtext('link')
-			pubDate = item.findtext('pubDate')
+			# Walk the children once instead of one findtext() scan per field
+			fields = dict.fromkeys(_ITEM_FIELDS)
+			for child in item:
+				if child.tag in fields and fields[child.tag] is None:
+					fields[child.tag] = child.text or ''
+			pubDate = fields['pubDate']
 			if pubDate == "":
-				desc = item.findtext('description')
-				added = re.search("Added: ([0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2})", desc)
-				date = datetime.strptime(added.group(1), '%Y-%m-%d %H:%M:%S')
+				added = _ADDED_RE.search(fields['description'])
+				date = strptime(added.group(1), _DATE_FORMAT)
 			else:
-				parsed = email.utils.parsedate_tz(pubDate)
-				date = datetime.fromtimestamp(email.utils.mktime_tz(parsed))
+				date = parse_pubdate(pubDate)
 
-			show = {'title': title, 'category': category, 'link': link, 'date': date.strftime("%Y-%m-%d %H:%M:%S")}
-			shows.append(show)
+			shows.append({'title': fields['title'], 'category': fields['category'], 'link': fields['link'], 'date': date})
 
 
 		for show in shows:
-			episodedict = {}
-			is_movie = False
-
-			part = re.split("(S[0-9]+E[0-9]+)", show['title'])
-			#part = map(str.strip, part)
-			part = ['' if x is None else x for x in part]
-			part = [p.strip() for p in part]
-
+			part = [p.strip() for p in split_episode(show['title'])]
 
 			if len(part) == 1:
-				seriespart = re.split("([0-9]{4}(?:\\s+|\\.)[0-9]{2}(?:\\s+|\\.)[0-9]{2})", part[0])
+				seriespart = split_date(part[0])
 				if len(seriespart) == 1:
-					movies.append({'title': show['title'], 'category': show['category'], 'link': show['link'], 'date': show['date']})
-					is_movie = True
-				else:
-					#seriespart = map(str.strip, seriespart)
-					seriespart = [s.strip() for s in seriespart]
-					episodedict.update({'title': seriespart[0]})
-					episodedict.update({'episode': seriespart[1]})
-					episodedict.update({'tags': seriespart[2]})
-			else:
-				episodedict = {'title': part[0]}
-				if is_movie is False:
-					episodedict.update({'episode': part[1]})
-					episodedict.update({'tags': part[2]})
-
-			if is_movie is False:
-				episodedict.update({'category': show['category']})
-				episodedict.update({'link': show['link']})
-				episodedict.update({'date': show['date']})
-				episodedict.update({'quality': 'Unknown'})
-
-			if episodedict:
-				allshows.append(episodedict)
-
-
-
+					movies.append(show)
+					continue
+				part = [s.strip() for s in seriespart]
 
-		for item in allshows:
-			if '1080p' in item['tags']:
-				item['quality'] = '1080p'
-			elif '720p' in item['tags']:
-				item['quality'] = '720p'
-			elif '2160p' in item['tags']:
-				item['quality'] = '2160p';
+			quality = search_quality(part[2])
+			allshows.append({'title': part[0], 'episode': part[1], 'tags': part[2], 'category': show['category'], 'link': show['link'], 'date': show['date'], 'quality': quality.group(1) if quality else 'Unknown'})
 
 		return allshows, movies
 
@@ -186,12 +227,22 @@ if __name__ == '__main__':
 
 	with conn:
 
+		existing = dh.get_existing_links(conn, [show['link'] for show in shows])
+		new_shows = []
 		for show in shows:
-			if dh.check_if_show_exists(conn, show['link']) is False:
-				showitems = (show['title'], show['episode'], show['quality'], show['tags'], show['category'], show['date'], show['link'])
-				row_id = dh.add_release(conn, showitems)
-				conn.commit()
-				log.info("New release: %s, %s, %s, %s %s" % (show['title'], show['episode'], show['quality'], show['date'], show['link']))
+			if show['link'] is None:
+				# Nothing to deduplicate on or download later
+				log.debug("Skipping release without link: %s, %s" % (show['title'], show['episode']))
+				continue
+			if show['link'].lower() not in existing:
+				new_shows.append(show)
+				existing.add(show['link'].lower())
+
+		showitems = [(show['title'], show['episode'], show['quality'], show['tags'], show['category'], show['date'], show['link']) for show in new_shows]
+		dh.add_releases_many(conn, showitems)
+		conn.commit()
+		for show in new_shows:
+			log.info("New release: %s, %s, %s, %s %s" % (show['title'], show['episode'], show['quality'], show['date'], show['link']))
 
 		dh.find_releases(conn)
 
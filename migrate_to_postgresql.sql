@@ -57,7 +57,9 @@ CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_releases_title_episode_lower ON rele
 CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_downloads_title_episode_lower ON downloads(LOWER(title), LOWER(episode));
 
 -- Standard indexes (removed partial index with NOW() - not immutable)
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_releases_date ON releases(date);
+-- Releases are inserted in date order, so a BRIN index prunes the 3-day
+-- window to the last few block ranges at a fraction of a B-tree's size
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_releases_date_brin ON releases USING BRIN (date) WITH (pages_per_range = 16);
 CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_downloads_release_id ON downloads(release_id);
 CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wishlist_title_lower ON wishlist(LOWER(title));
 
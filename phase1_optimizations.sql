@@ -2,6 +2,20 @@
 -- These functions push application logic into PostgreSQL for better performance
 -- Expected improvement: 53-82% faster overall runtime
 
+-- =============================================================================
+-- Supporting indexes
+-- =============================================================================
+-- The lookups below compare LOWER(col) = LOWER(param); they only avoid a
+-- sequential scan when an index on the same expression exists. These match
+-- the indexes in migrate_to_postgresql.sql and are no-ops there, but make
+-- sure databases created any other way get them too.
+-- Unlike the migration, these are built without CONCURRENTLY, which cannot
+-- run inside a transaction block (the tests load this script in one), and
+-- writes to the table block while they build. On a large live database,
+-- create them with migrate_to_postgresql.sql first.
+CREATE INDEX IF NOT EXISTS idx_releases_link_lower ON releases(LOWER(link));
+CREATE INDEX IF NOT EXISTS idx_downloads_title_episode_lower ON downloads(LOWER(title), LOWER(episode));
+
 -- =============================================================================
 -- Phase 1.1: Duplicate Check Function (5-10% improvement)
 -- =============================================================================
@@ -47,6 +61,12 @@ COMMENT ON FUNCTION is_not_downloaded IS
 -- Replaces the entire find_releases() loop with N+2 queries
 -- Single set-based query replaces N wishlist queries + filtering loops
 -- Includes regex matching, download checking, and quality prioritization
+-- Include/exclude patterns are compiled by the backend's regex cache (the 32
+-- most recently used patterns), so each wishlist pattern is compiled once per
+-- session rather than once per candidate row.
+-- Plain SQL body, so the planner inlines the call into the calling query.
+-- The CTE is referenced once and is inlined too, so the plan itself is the
+-- same as a single SELECT.
 CREATE OR REPLACE FUNCTION find_matching_releases()
 RETURNS TABLE(
     release_id INTEGER,
@@ -57,50 +77,58 @@ RETURNS TABLE(
     tags TEXT,
     wishlist_id INTEGER
 ) AS $$
-BEGIN
-    RETURN QUERY
-    SELECT DISTINCT ON (r.title, r.episode)
-        r.id AS release_id,
-        r.title,
-        r.episode,
-        r.quality,
-        r.link,
-        r.tags,
-        w.id AS wishlist_id
-    FROM releases r
-    INNER JOIN wishlist w ON LOWER(r.title) = LOWER(w.title)
-    WHERE 
-        -- Only recent releases (within 3 days)
-        r.date > NOW() - INTERVAL '3 days'
-        
-        -- Episode must be >= min_episode (if specified)
-        AND (w.min_episode IS NULL OR LOWER(r.episode) >= LOWER(w.min_episode))
-        
-        -- Include filter: tags must match pattern (if specified)
-        AND (w.includeprops IS NULL OR r.tags ~* w.includeprops)
-        
-        -- Exclude filter: tags must NOT match pattern (if specified)
-        AND (w.excludeprops IS NULL OR r.tags !~* w.excludeprops)
-        
-        -- Not already downloaded
-        AND NOT EXISTS(
-            SELECT 1 FROM downloads d 
-            WHERE LOWER(d.title) = LOWER(r.title) 
-            AND LOWER(d.episode) = LOWER(r.episode)
-        )
+    WITH matched AS (
+        -- One pass over the recent releases joined to the wishlist filters
+        SELECT
+            r.id AS release_id,
+            r.title,
+            r.episode,
+            r.quality,
+            r.link,
+            r.tags,
+            w.id AS wishlist_id
+        FROM releases r
+        INNER JOIN wishlist w ON LOWER(r.title) = LOWER(w.title)
+        WHERE 
+            -- Only recent releases (within 3 days)
+            r.date > NOW() - INTERVAL '3 days'
+            
+            -- Episode must be >= min_episode (if specified)
+            AND (w.min_episode IS NULL OR LOWER(r.episode) >= LOWER(w.min_episode))
+            
+            -- Include filter: tags must match pattern (if specified)
+            AND (w.includeprops IS NULL OR r.tags ~* w.includeprops)
+            
+            -- Exclude filter: tags must NOT match pattern (if specified)
+            AND (w.excludeprops IS NULL OR r.tags !~* w.excludeprops)
+    )
+    SELECT DISTINCT ON (m.title, m.episode)
+        m.release_id,
+        m.title,
+        m.episode,
+        m.quality,
+        m.link,
+        m.tags,
+        m.wishlist_id
+    FROM matched m
+    -- Not already downloaded
+    WHERE NOT EXISTS(
+        SELECT 1 FROM downloads d 
+        WHERE LOWER(d.title) = LOWER(m.title) 
+        AND LOWER(d.episode) = LOWER(m.episode)
+    )
     
     -- Prioritize by title, episode, then best quality
     ORDER BY 
-        r.title, 
-        r.episode, 
-        CASE r.quality 
+        m.title, 
+        m.episode, 
+        CASE m.quality 
             WHEN '2160p' THEN 1
             WHEN '1080p' THEN 2
             WHEN '720p' THEN 3
             ELSE 4
         END;
-END;
-$$ LANGUAGE plpgsql STABLE;
+$$ LANGUAGE sql STABLE;
 
 COMMENT ON FUNCTION find_matching_releases IS 
 'Find all releases matching wishlist criteria that have not been downloaded yet. Applies all filters (date, min_episode, include/exclude props, download status) in a single query. Returns releases ordered by quality preference.';
@@ -7,70 +7,129 @@ Tests cover:
 2. Wishlist matching and filtering logic
 3. Regex property checking
 4. End-to-end release processing workflow
+5. RSS feed parsing
 
 These tests use a real PostgreSQL database to ensure optimizations work correctly.
 """
 
 import pytest
 import psycopg2
+import psycopg2.errors
 import tempfile
+import io
+import functools
 import os
+import uuid
 from datetime import datetime, timedelta
+from psycopg2.extras import execute_values
+import dollhouse
 from dollhouse import DollHouse
 
 
-# Test database configuration
+# Test database configuration; set PGHOST to a socket directory (e.g.
+# /var/run/postgresql) to connect over the local Unix socket instead of TCP
 TEST_DB_CONFIG = {
-    'host': 'localhost',
+    'host': os.environ.get('PGHOST', 'localhost'),
     'database': 'dollhouse_test',
     'user': os.environ.get('PGUSER', 'postgres'),
     'password': os.environ.get('PGPASSWORD', ''),
 }
 
+# The test database is long-lived; each session (and so each pytest-xdist
+# worker) builds its tables in its own schema, dropped at teardown
+TEST_SCHEMA = f"test_{uuid.uuid4().hex}"
 
-@pytest.fixture(scope='session')
-def test_db_connection():
-    """Create a test database connection."""
-    # Connect to default postgres db to create test db
-    conn = psycopg2.connect(
+TABLES_SQL = """
+    -- Create tables
+    CREATE TABLE releases (
+        id SERIAL PRIMARY KEY,
+        title TEXT NOT NULL,
+        episode TEXT NOT NULL,
+        quality TEXT NOT NULL,
+        tags TEXT NOT NULL,
+        category TEXT NOT NULL,
+        date TIMESTAMP,
+        link TEXT
+    );
+    
+    CREATE TABLE downloads (
+        id SERIAL PRIMARY KEY,
+        title TEXT NOT NULL,
+        episode TEXT NOT NULL,
+        release_id INTEGER
+    );
+    
+    CREATE TABLE wishlist (
+        id SERIAL PRIMARY KEY,
+        title TEXT NOT NULL,
+        includeprops TEXT,
+        excludeprops TEXT,
+        min_episode TEXT
+    );
+"""
+
+INDEXES_SQL = """
+    -- Create indexes
+    CREATE INDEX idx_releases_link_lower ON releases(LOWER(link));
+    CREATE INDEX idx_releases_title_episode_lower ON releases(LOWER(title), LOWER(episode));
+    CREATE INDEX idx_downloads_title_episode_lower ON downloads(LOWER(title), LOWER(episode));
+    CREATE INDEX idx_releases_date_brin ON releases USING BRIN (date) WITH (pages_per_range = 16);
+    CREATE INDEX idx_wishlist_title_lower ON wishlist(LOWER(title));
+"""
+
+SCHEMA_SQL = TABLES_SQL + INDEXES_SQL
+
+
+def connect(database, **kwargs):
+    """Connect to a database on the test server."""
+    return psycopg2.connect(
         host=TEST_DB_CONFIG['host'],
-        database='postgres',
+        database=database,
         user=TEST_DB_CONFIG['user'],
-        password=TEST_DB_CONFIG['password']
+        password=TEST_DB_CONFIG['password'],
+        **kwargs
     )
+
+
+@functools.lru_cache(maxsize=1)
+def read_phase1_sql():
+    """Read the Phase 1 optimizations script (once per process)."""
+    with open('phase1_optimizations.sql', 'r') as f:
+        return f.read()
+
+
+@pytest.fixture(scope='session')
+def test_db_connection():
+    """Create a test database connection confined to a fresh schema."""
+    # Connect to default postgres db to create test db on first use
+    conn = connect('postgres')
     conn.autocommit = True
     cur = conn.cursor()
-    
-    # Drop and recreate test database
-    cur.execute("DROP DATABASE IF EXISTS dollhouse_test")
-    cur.execute("CREATE DATABASE dollhouse_test")
+    cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (TEST_DB_CONFIG['database'],))
+    if cur.fetchone() is None:
+        try:
+            cur.execute(f"CREATE DATABASE {TEST_DB_CONFIG['database']}")
+        except (psycopg2.errors.DuplicateDatabase, psycopg2.errors.UniqueViolation):
+            pass  # Created by a parallel worker in the meantime
     cur.close()
     conn.close()
     
-    # Connect to test database
-    test_conn = psycopg2.connect(
-        host=TEST_DB_CONFIG['host'],
-        database=TEST_DB_CONFIG['database'],
-        user=TEST_DB_CONFIG['user'],
-        password=TEST_DB_CONFIG['password']
-    )
+    # Connect to test database; unqualified names resolve to our schema.
+    # Test data is disposable, so commits need not wait for the WAL flush.
+    test_conn = connect(TEST_DB_CONFIG['database'],
+                        options=f"-c search_path={TEST_SCHEMA},public -c synchronous_commit=off")
+    cur = test_conn.cursor()
+    cur.execute(f"CREATE SCHEMA {TEST_SCHEMA}")
+    test_conn.commit()
     
     yield test_conn
     
+    # Cleanup: drop the schema (the database is kept for the next run)
+    test_conn.rollback()
+    cur = test_conn.cursor()
+    cur.execute(f"DROP SCHEMA {TEST_SCHEMA} CASCADE")
+    test_conn.commit()
     test_conn.close()
-    
-    # Cleanup: drop test database
-    conn = psycopg2.connect(
-        host=TEST_DB_CONFIG['host'],
-        database='postgres',
-        user=TEST_DB_CONFIG['user'],
-        password=TEST_DB_CONFIG['password']
-    )
-    conn.autocommit = True
-    cur = conn.cursor()
-    cur.execute("DROP DATABASE IF EXISTS dollhouse_test")
-    cur.close()
-    conn.close()
 
 
 @pytest.fixture(scope='session')
@@ -78,69 +137,34 @@ def db_schema(test_db_connection):
     """Initialize database schema."""
     cur = test_db_connection.cursor()
     
-    # Create tables
-    cur.execute("""
-        CREATE TABLE releases (
-            id SERIAL PRIMARY KEY,
-            title TEXT NOT NULL,
-            episode TEXT NOT NULL,
-            quality TEXT NOT NULL,
-            tags TEXT NOT NULL,
-            category TEXT NOT NULL,
-            date TIMESTAMP,
-            link TEXT
-        )
-    """)
-    
-    cur.execute("""
-        CREATE TABLE downloads (
-            id SERIAL PRIMARY KEY,
-            title TEXT NOT NULL,
-            episode TEXT NOT NULL,
-            release_id INTEGER
-        )
-    """)
-    
-    cur.execute("""
-        CREATE TABLE wishlist (
-            id SERIAL PRIMARY KEY,
-            title TEXT NOT NULL,
-            includeprops TEXT,
-            excludeprops TEXT,
-            min_episode TEXT
-        )
-    """)
-    
-    # Create indexes
-    cur.execute("CREATE INDEX idx_releases_link_lower ON releases(LOWER(link))")
-    cur.execute("CREATE INDEX idx_releases_title_episode_lower ON releases(LOWER(title), LOWER(episode))")
-    cur.execute("CREATE INDEX idx_downloads_title_episode_lower ON downloads(LOWER(title), LOWER(episode))")
-    cur.execute("CREATE INDEX idx_releases_date ON releases(date)")
-    cur.execute("CREATE INDEX idx_wishlist_title_lower ON wishlist(LOWER(title))")
-    
-    # Apply Phase 1 optimizations
-    with open('phase1_optimizations.sql', 'r') as f:
-        cur.execute(f.read())
+    # Tables, indexes and the Phase 1 optimizations in a single round trip
+    cur.execute(SCHEMA_SQL + read_phase1_sql())
     
     test_db_connection.commit()
     
     yield test_db_connection
     
-    # Cleanup not needed - database will be dropped
+    # Cleanup not needed - schema will be dropped
 
 
 @pytest.fixture
 def clean_db(db_schema):
-    """Clean database before each test."""
-    cur = db_schema.cursor()
-    cur.execute("TRUNCATE releases, downloads, wishlist RESTART IDENTITY CASCADE")
-    db_schema.commit()
+    """Run each test in its own transaction, rolled back afterwards."""
     yield db_schema
+    db_schema.rollback()
 
 
 @pytest.fixture
-def dollhouse_instance(clean_db):
-    """Create DollHouse instance with test configuration."""
+def db_cursor(clean_db):
+    """One cursor on the test connection, shared by all of a test's queries."""
+    cur = clean_db.cursor()
+    yield cur
+    cur.close()
+
+
+@pytest.fixture(scope='module')
+def shared_dollhouse(db_schema):
+    """Create one DollHouse instance with test configuration per module."""
     # Create temporary config file
     config_content = f"""
 rss_link = https://test.example.com/rss
@@ -155,9 +179,8 @@ save_dir = /tmp/dollhouse_test
     dh = DollHouse(config_path)
     
     # Override create_connection to use our test connection
-    original_create_connection = dh.create_connection
     def test_create_connection():
-        return clean_db
+        return db_schema
     dh.create_connection = test_create_connection
     
     yield dh
@@ -166,37 +189,116 @@ save_dir = /tmp/dollhouse_test
     os.unlink(config_path)
 
 
+@pytest.fixture
+def dollhouse_instance(shared_dollhouse, clean_db):
+    """Hand the shared DollHouse instance to a test, undoing its overrides afterwards."""
+    # Tests replace methods such as download_episode on the instance
+    attrs = dict(vars(shared_dollhouse))
+    yield shared_dollhouse
+    vars(shared_dollhouse).clear()
+    vars(shared_dollhouse).update(attrs)
+
+
+@pytest.fixture
+def feed_dollhouse(tmp_path):
+    """Create a DollHouse instance for tests that never touch the database."""
+    config_path = tmp_path / "dollhouse.ini"
+    config_path.write_text(f"""
+rss_link = https://test.example.com/rss
+database = dbname={TEST_DB_CONFIG['database']}
+save_dir = {tmp_path}
+""")
+    return DollHouse(str(config_path))
+
+
 # Test data helpers
+
+# One clock reading for every sample release date. It is taken at import
+# rather than fixed, because find_matching_releases() compares against the
+# server's NOW().
+NOW = datetime.now()
+
+
 def create_sample_release(title="Breaking Bad", episode="S01E01", quality="1080p", 
                          tags="1080p WEB-DL", category="TV", days_ago=1,
                          link="https://example.com/release1"):
     """Helper to create sample release data."""
-    date = (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%d %H:%M:%S")
+    date = NOW - timedelta(days=days_ago)
     return (title, episode, quality, tags, category, date, link)
 
 
+def add_sample_releases(conn, *releases):
+    """Helper to insert sample releases in one statement; returns their ids."""
+    cur = conn.cursor()
+    rows = execute_values(cur, """
+        INSERT INTO releases(title, episode, quality, tags, category, date, link)
+        VALUES %s
+        RETURNING id
+    """, releases, fetch=True)
+    return [row[0] for row in rows]
+
+
+# Characters COPY text format treats specially inside a column value
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def seed_releases(conn, rows):
+    """Helper to bulk-load many sample releases with COPY."""
+    buf = io.StringIO("".join(
+        "\t".join(r"\N" if value is None else str(value).translate(COPY_ESCAPES) for value in row) + "\n"
+        for row in rows))
+    cur = conn.cursor()
+    cur.copy_expert("COPY releases(title, episode, quality, tags, category, date, link) FROM STDIN", buf)
+
+
 class TestDatabaseOperations:
     """Test basic database operations."""
     
-    def test_add_release(self, dollhouse_instance, clean_db):
+    def test_get_cursor_reused(self, dollhouse_instance, clean_db):
+        """Test that queries on one connection share a cursor."""
+        cur = dollhouse_instance.get_cursor(clean_db)
+        assert dollhouse_instance.get_cursor(clean_db) is cur
+        
+        # A closed cursor is replaced
+        cur.close()
+        assert dollhouse_instance.get_cursor(clean_db) is not cur
+    
+    def test_add_release(self, dollhouse_instance, clean_db, db_cursor):
         """Test adding a release to database."""
         show = create_sample_release()
         
         row_id = dollhouse_instance.add_release(clean_db, show)
-        clean_db.commit()
         
         assert row_id is not None
         
         # Verify release was added
-        cur = clean_db.cursor()
-        cur.execute("SELECT * FROM releases WHERE id = %s", (row_id,))
-        result = cur.fetchone()
+        db_cursor.execute("SELECT * FROM releases WHERE id = %s", (row_id,))
+        result = db_cursor.fetchone()
         
         assert result is not None
         assert result[1] == "Breaking Bad"
         assert result[2] == "S01E01"
         assert result[3] == "1080p"
     
+    def test_add_releases_many(self, dollhouse_instance, clean_db, db_cursor):
+        """Test adding several releases in one statement."""
+        shows = [
+            create_sample_release(episode="S01E01", link="https://example.com/many1"),
+            create_sample_release(episode="S01E02", link="https://example.com/many2"),
+        ]
+        
+        row_ids = dollhouse_instance.add_releases_many(clean_db, shows)
+        
+        assert len(row_ids) == 2
+        
+        # Verify ids are returned in insertion order
+        db_cursor.execute("SELECT id, episode FROM releases ORDER BY id")
+        assert db_cursor.fetchall() == [(row_ids[0], "S01E01"), (row_ids[1], "S01E02")]
+    
+    def test_add_releases_many_empty(self, dollhouse_instance, clean_db):
+        """Test batch insert with nothing to add."""
+        assert dollhouse_instance.add_releases_many(clean_db, []) == []
+    
     def test_check_if_show_exists_false(self, dollhouse_instance, clean_db):
         """Test checking for non-existent release."""
         result = dollhouse_instance.check_if_show_exists(clean_db, "https://example.com/nonexistent")
@@ -206,7 +308,6 @@ class TestDatabaseOperations:
         """Test checking for existing release."""
         show = create_sample_release(link="https://example.com/exists")
         dollhouse_instance.add_release(clean_db, show)
-        clean_db.commit()
         
         result = dollhouse_instance.check_if_show_exists(clean_db, "https://example.com/exists")
         assert result is True
@@ -215,35 +316,60 @@ class TestDatabaseOperations:
         """Test case-insensitive link checking."""
         show = create_sample_release(link="https://EXAMPLE.com/CaseSensitive")
         dollhouse_instance.add_release(clean_db, show)
-        clean_db.commit()
         
         result = dollhouse_instance.check_if_show_exists(clean_db, "https://example.com/casesensitive")
         assert result is True
     
-    def test_add_downloads(self, dollhouse_instance, clean_db):
+    def test_get_existing_links(self, dollhouse_instance, clean_db):
+        """Test fetching the already-known links of a feed in one query."""
+        dollhouse_instance.add_release(clean_db, create_sample_release(link="https://EXAMPLE.com/Known"))
+        
+        existing = dollhouse_instance.get_existing_links(
+            clean_db, ["https://example.com/known", "https://example.com/new"])
+        assert existing == {"https://example.com/known"}
+    
+    def test_get_existing_links_empty(self, dollhouse_instance, clean_db):
+        """Test existence lookup with no links."""
+        assert dollhouse_instance.get_existing_links(clean_db, []) == set()
+    
+    def test_get_existing_links_ignores_missing_links(self, dollhouse_instance, clean_db):
+        """Test that feed items without a link are left out of the lookup."""
+        dollhouse_instance.add_release(clean_db, create_sample_release(link="https://example.com/known"))
+        
+        existing = dollhouse_instance.get_existing_links(clean_db, [None, "https://example.com/known"])
+        assert existing == {"https://example.com/known"}
+    
+    def test_add_downloads(self, dollhouse_instance, clean_db, db_cursor):
         """Test adding a download record."""
         # First add a release
         release = create_sample_release()
         release_id = dollhouse_instance.add_release(clean_db, release)
-        clean_db.commit()
         
         # Add download
         download = ("Breaking Bad", "S01E01", release_id)
         download_id = dollhouse_instance.add_downloads(clean_db, download)
-        clean_db.commit()
         
         assert download_id is not None
         
         # Verify download was added
-        cur = clean_db.cursor()
-        cur.execute("SELECT * FROM downloads WHERE id = %s", (download_id,))
-        result = cur.fetchone()
+        db_cursor.execute("SELECT * FROM downloads WHERE id = %s", (download_id,))
+        result = db_cursor.fetchone()
         
         assert result is not None
         assert result[1] == "Breaking Bad"
         assert result[2] == "S01E01"
         assert result[3] == release_id
     
+    def test_add_downloads_many(self, dollhouse_instance, clean_db, db_cursor):
+        """Test adding several download records in one statement."""
+        downloads = [("Breaking Bad", "S01E01", 1), ("Breaking Bad", "S01E02", 2)]
+        download_ids = dollhouse_instance.add_downloads_many(clean_db, downloads)
+        
+        assert len(download_ids) == 2
+        
+        db_cursor.execute("SELECT title, episode, release_id FROM downloads ORDER BY id")
+        assert db_cursor.fetchall() == downloads
+    
     def test_check_to_download_true(self, dollhouse_instance, clean_db):
         """Test checking if episode should be downloaded (not yet downloaded)."""
         result = dollhouse_instance.check_to_download(clean_db, "Breaking Bad", "S01E01")
@@ -254,7 +380,6 @@ class TestDatabaseOperations:
         # Add a download
         download = ("Breaking Bad", "S01E01", 1)
         dollhouse_instance.add_downloads(clean_db, download)
-        clean_db.commit()
         
         result = dollhouse_instance.check_to_download(clean_db, "Breaking Bad", "S01E01")
         assert result is False
@@ -263,19 +388,16 @@ class TestDatabaseOperations:
         """Test case-insensitive download checking."""
         download = ("Breaking Bad", "S01E01", 1)
         dollhouse_instance.add_downloads(clean_db, download)
-        clean_db.commit()
         
         result = dollhouse_instance.check_to_download(clean_db, "BREAKING BAD", "s01e01")
         assert result is False
     
-    def test_get_wishlist(self, dollhouse_instance, clean_db):
+    def test_get_wishlist(self, dollhouse_instance, clean_db, db_cursor):
         """Test retrieving wishlist."""
-        cur = clean_db.cursor()
-        cur.execute("""
+        db_cursor.execute("""
             INSERT INTO wishlist(title, min_episode, includeprops, excludeprops)
             VALUES ('Breaking Bad', 'S01E01', '1080p', 'HDCAM')
         """)
-        clean_db.commit()
         
         wishlist = dollhouse_instance.get_wishlist(clean_db)
         
@@ -289,27 +411,24 @@ class TestDatabaseOperations:
 class TestWishlistMatching:
     """Test wishlist matching and release finding logic."""
     
-    def test_find_releases_no_wishlist(self, dollhouse_instance, clean_db):
+    def test_find_releases_no_wishlist(self, dollhouse_instance, clean_db, db_cursor):
         """Test find_releases with empty wishlist."""
         # Add some releases
         show1 = create_sample_release()
         dollhouse_instance.add_release(clean_db, show1)
-        clean_db.commit()
         
         # Run find_releases (should do nothing with empty wishlist)
         dollhouse_instance.find_releases(clean_db)
         
         # No downloads should be created
-        cur = clean_db.cursor()
-        cur.execute("SELECT COUNT(*) FROM downloads")
-        count = cur.fetchone()[0]
+        db_cursor.execute("SELECT COUNT(*) FROM downloads")
+        count = db_cursor.fetchone()[0]
         assert count == 0
     
-    def test_find_releases_basic_match(self, dollhouse_instance, clean_db):
+    def test_find_releases_basic_match(self, dollhouse_instance, clean_db, db_cursor):
         """Test basic wishlist matching."""
         # Add wishlist item
-        cur = clean_db.cursor()
-        cur.execute("""
+        db_cursor.execute("""
             INSERT INTO wishlist(title, min_episode, includeprops, excludeprops)
             VALUES ('Breaking Bad', 'S01E01', NULL, NULL)
         """)
@@ -321,7 +440,6 @@ class TestWishlistMatching:
             link="https://example.com/bb-s01e02"
         )
         dollhouse_instance.add_release(clean_db, show)
-        clean_db.commit()
         
         # Mock download_episode to avoid actual download
         def mock_download(link):
@@ -332,43 +450,48 @@ class TestWishlistMatching:
         dollhouse_instance.find_releases(clean_db)
         
         # Verify download was recorded
-        cur.execute("SELECT COUNT(*) FROM downloads WHERE title = 'Breaking Bad' AND episode = 'S01E02'")
-        count = cur.fetchone()[0]
+        db_cursor.execute("SELECT COUNT(*) FROM downloads WHERE title = 'Breaking Bad' AND episode = 'S01E02'")
+        count = db_cursor.fetchone()[0]
         assert count == 1
     
-    def test_find_releases_min_episode_filter(self, dollhouse_instance, clean_db):
-        """Test min_episode filtering."""
-        # Add wishlist with min_episode
-        cur = clean_db.cursor()
-        cur.execute("""
+    @pytest.mark.parametrize("wishlist, releases, expected", [
+        # Only episodes at or above min_episode
+        pytest.param(
+            ('Breaking Bad', 'S02E01', None, None),
+            [dict(episode="S01E05", link="https://example.com/bb-s01e05"),
+             dict(episode="S02E01", link="https://example.com/bb-s02e01"),
+             dict(episode="S02E05", link="https://example.com/bb-s02e05")],
+            ["S02E01", "S02E05"],
+            id="min_episode"),
+        # Only tags matching includeprops
+        pytest.param(
+            ('Breaking Bad', None, '1080p', None),
+            [dict(episode="S01E01", tags="1080p WEB-DL", link="https://example.com/bb-1080p"),
+             dict(episode="S01E02", quality="720p", tags="720p WEB-DL", link="https://example.com/bb-720p")],
+            ["S01E01"],
+            id="include_props"),
+        # No tags matching excludeprops
+        pytest.param(
+            ('Breaking Bad', None, None, 'HDCAM'),
+            [dict(episode="S01E01", tags="1080p WEB-DL", link="https://example.com/bb-webdl"),
+             dict(episode="S01E02", tags="1080p HDCAM", link="https://example.com/bb-hdcam")],
+            ["S01E01"],
+            id="exclude_props"),
+        # Nothing older than 3 days
+        pytest.param(
+            ('Breaking Bad', None, None, None),
+            [dict(episode="S01E01", days_ago=4, link="https://example.com/bb-old"),
+             dict(episode="S01E02", days_ago=1, link="https://example.com/bb-new")],
+            ["S01E02"],
+            id="old_releases_ignored"),
+    ])
+    def test_find_releases_filters(self, dollhouse_instance, clean_db, db_cursor, wishlist, releases, expected):
+        """Test that the wishlist filters decide which releases are downloaded."""
+        db_cursor.execute("""
             INSERT INTO wishlist(title, min_episode, includeprops, excludeprops)
-            VALUES ('Breaking Bad', 'S02E01', NULL, NULL)
-        """)
-        
-        # Add release below minimum (should be ignored)
-        show1 = create_sample_release(
-            title="Breaking Bad",
-            episode="S01E05",
-            link="https://example.com/bb-s01e05"
-        )
-        dollhouse_instance.add_release(clean_db, show1)
-        
-        # Add release at minimum (should be downloaded)
-        show2 = create_sample_release(
-            title="Breaking Bad",
-            episode="S02E01",
-            link="https://example.com/bb-s02e01"
-        )
-        dollhouse_instance.add_release(clean_db, show2)
-        
-        # Add release above minimum (should be downloaded)
-        show3 = create_sample_release(
-            title="Breaking Bad",
-            episode="S02E05",
-            link="https://example.com/bb-s02e05"
-        )
-        dollhouse_instance.add_release(clean_db, show3)
-        clean_db.commit()
+            VALUES (%s, %s, %s, %s)
+        """, wishlist)
+        add_sample_releases(clean_db, *(create_sample_release(**release) for release in releases))
         
         # Mock download
         def mock_download(link):
@@ -378,177 +501,223 @@ class TestWishlistMatching:
         # Run find_releases
         dollhouse_instance.find_releases(clean_db)
         
-        # Verify only S02+ episodes were downloaded
-        cur.execute("SELECT episode FROM downloads WHERE title = 'Breaking Bad' ORDER BY episode")
-        episodes = [row[0] for row in cur.fetchall()]
-        assert "S01E05" not in episodes
-        assert "S02E01" in episodes
-        assert "S02E05" in episodes
-    
-    def test_find_releases_include_props(self, dollhouse_instance, clean_db):
-        """Test includeprops filtering."""
-        # Add wishlist with include filter
-        cur = clean_db.cursor()
-        cur.execute("""
+        # Verify exactly the expected episodes were downloaded
+        db_cursor.execute("SELECT episode FROM downloads WHERE title = 'Breaking Bad' ORDER BY episode")
+        assert [row[0] for row in db_cursor.fetchall()] == expected
+    
+    def test_find_releases_no_duplicate_downloads(self, dollhouse_instance, clean_db, db_cursor):
+        """Test that same episode is not downloaded twice."""
+        # Add wishlist
+        db_cursor.execute("""
             INSERT INTO wishlist(title, min_episode, includeprops, excludeprops)
-            VALUES ('Breaking Bad', NULL, '1080p', NULL)
+            VALUES ('Breaking Bad', NULL, NULL, NULL)
         """)
         
-        # Add 1080p release (should match)
-        show1 = create_sample_release(
+        # Add release
+        show = create_sample_release(
             title="Breaking Bad",
             episode="S01E01",
-            tags="1080p WEB-DL",
-            link="https://example.com/bb-1080p"
-        )
-        dollhouse_instance.add_release(clean_db, show1)
-        
-        # Add 720p release (should not match)
-        show2 = create_sample_release(
-            title="Breaking Bad",
-            episode="S01E02",
-            quality="720p",
-            tags="720p WEB-DL",
-            link="https://example.com/bb-720p"
+            link="https://example.com/bb-s01e01"
         )
-        dollhouse_instance.add_release(clean_db, show2)
-        clean_db.commit()
+        release_id = dollhouse_instance.add_release(clean_db, show)
         
         # Mock download
+        download_count = [0]
         def mock_download(link):
+            download_count[0] += 1
             return True
         dollhouse_instance.download_episode = mock_download
         
-        # Run find_releases
+        # Run find_releases first time
         dollhouse_instance.find_releases(clean_db)
+        assert download_count[0] == 1
+        
+        # Run find_releases again (should not download again)
+        dollhouse_instance.find_releases(clean_db)
+        assert download_count[0] == 1  # Still 1, not 2
         
-        # Verify only 1080p was downloaded
-        cur.execute("SELECT episode FROM downloads WHERE title = 'Breaking Bad'")
-        episodes = [row[0] for row in cur.fetchall()]
-        assert "S01E01" in episodes
-        assert "S01E02" not in episodes
-    
-    def test_find_releases_exclude_props(self, dollhouse_instance, clean_db):
-        """Test excludeprops filtering."""
-        # Add wishlist with exclude filter
-        cur = clean_db.cursor()
-        cur.execute("""
+        # Verify only one download record
+        db_cursor.execute("SELECT COUNT(*) FROM downloads WHERE title = 'Breaking Bad' AND episode = 'S01E01'")
+        count = db_cursor.fetchone()[0]
+        assert count == 1
+    
+    def test_find_releases_downloads_all_matches(self, dollhouse_instance, clean_db, db_cursor):
+        """Test that every matching release is downloaded and recorded."""
+        db_cursor.execute("""
             INSERT INTO wishlist(title, min_episode, includeprops, excludeprops)
-            VALUES ('Breaking Bad', NULL, NULL, 'HDCAM')
+            VALUES ('Breaking Bad', NULL, NULL, NULL)
         """)
         
-        # Add good release (should match)
-        show1 = create_sample_release(
-            title="Breaking Bad",
-            episode="S01E01",
-            tags="1080p WEB-DL",
-            link="https://example.com/bb-webdl"
-        )
-        dollhouse_instance.add_release(clean_db, show1)
-        
-        # Add HDCAM release (should not match)
-        show2 = create_sample_release(
-            title="Breaking Bad",
-            episode="S01E02",
-            tags="1080p HDCAM",
-            link="https://example.com/bb-hdcam"
-        )
-        dollhouse_instance.add_release(clean_db, show2)
-        clean_db.commit()
+        links = [f"https://example.com/bb-s01e0{i}" for i in range(1, 6)]
+        add_sample_releases(clean_db, *(
+            create_sample_release(title="Breaking Bad", episode=f"S01E0{i}", link=link)
+            for i, link in enumerate(links, start=1)))
         
         # Mock download
+        downloaded_links = []
         def mock_download(link):
+            downloaded_links.append(link)
             return True
         dollhouse_instance.download_episode = mock_download
         
-        # Run find_releases
         dollhouse_instance.find_releases(clean_db)
         
-        # Verify only non-HDCAM was downloaded
-        cur.execute("SELECT episode FROM downloads WHERE title = 'Breaking Bad'")
-        episodes = [row[0] for row in cur.fetchall()]
-        assert "S01E01" in episodes
-        assert "S01E02" not in episodes
+        assert sorted(downloaded_links) == links
+        db_cursor.execute("SELECT episode FROM downloads WHERE title = 'Breaking Bad' ORDER BY episode")
+        episodes = [row[0] for row in db_cursor.fetchall()]
+        assert episodes == [f"S01E0{i}" for i in range(1, 6)]
     
-    def test_find_releases_old_releases_ignored(self, dollhouse_instance, clean_db):
-        """Test that releases older than 3 days are ignored."""
-        # Add wishlist
-        cur = clean_db.cursor()
-        cur.execute("""
+    def test_find_releases_records_downloads_after_failure(self, dollhouse_instance, clean_db, db_cursor):
+        """Test that one failed download does not stop the others being recorded."""
+        db_cursor.execute("""
             INSERT INTO wishlist(title, min_episode, includeprops, excludeprops)
             VALUES ('Breaking Bad', NULL, NULL, NULL)
         """)
         
-        # Add old release (4 days ago - should be ignored)
-        show1 = create_sample_release(
-            title="Breaking Bad",
-            episode="S01E01",
-            days_ago=4,
-            link="https://example.com/bb-old"
-        )
-        dollhouse_instance.add_release(clean_db, show1)
-        
-        # Add recent release (1 day ago - should be downloaded)
-        show2 = create_sample_release(
-            title="Breaking Bad",
-            episode="S01E02",
-            days_ago=1,
-            link="https://example.com/bb-new"
-        )
-        dollhouse_instance.add_release(clean_db, show2)
-        clean_db.commit()
+        links = [f"https://example.com/bb-s01e0{i}" for i in range(1, 4)]
+        add_sample_releases(clean_db, *(
+            create_sample_release(title="Breaking Bad", episode=f"S01E0{i}", link=link)
+            for i, link in enumerate(links, start=1)))
         
-        # Mock download
+        # Mock download failing for the second episode
         def mock_download(link):
+            if link == links[1]:
+                raise OSError("connection reset")
             return True
         dollhouse_instance.download_episode = mock_download
         
-        # Run find_releases
         dollhouse_instance.find_releases(clean_db)
         
-        # Verify only recent release was downloaded
-        cur.execute("SELECT episode FROM downloads WHERE title = 'Breaking Bad'")
-        episodes = [row[0] for row in cur.fetchall()]
-        assert "S01E01" not in episodes
-        assert "S01E02" in episodes
+        db_cursor.execute("SELECT episode FROM downloads WHERE title = 'Breaking Bad' ORDER BY episode")
+        episodes = [row[0] for row in db_cursor.fetchall()]
+        assert episodes == ["S01E01", "S01E03"]
     
-    def test_find_releases_no_duplicate_downloads(self, dollhouse_instance, clean_db):
-        """Test that same episode is not downloaded twice."""
-        # Add wishlist
-        cur = clean_db.cursor()
-        cur.execute("""
+    @pytest.mark.parametrize("count", [100, 500])
+    def test_find_releases_many_releases(self, dollhouse_instance, clean_db, count, db_cursor):
+        """Test matching against hundreds of seeded releases."""
+        db_cursor.execute("""
             INSERT INTO wishlist(title, min_episode, includeprops, excludeprops)
-            VALUES ('Breaking Bad', NULL, NULL, NULL)
+            VALUES ('Breaking Bad', NULL, '1080p', NULL)
         """)
         
-        # Add release
-        show = create_sample_release(
-            title="Breaking Bad",
-            episode="S01E01",
-            link="https://example.com/bb-s01e01"
-        )
-        release_id = dollhouse_instance.add_release(clean_db, show)
-        clean_db.commit()
+        # Half match the wishlist, half are the 720p copies it filters out
+        seed_releases(clean_db, [
+            create_sample_release(episode=f"S01E{i:03d}", quality=quality, tags=f"{quality} WEB-DL",
+                                  link=f"https://example.com/bb-{quality}-{i}")
+            for i in range(count // 2) for quality in ("1080p", "720p")])
         
         # Mock download
-        download_count = [0]
         def mock_download(link):
-            download_count[0] += 1
             return True
         dollhouse_instance.download_episode = mock_download
         
-        # Run find_releases first time
-        dollhouse_instance.find_releases(clean_db)
-        assert download_count[0] == 1
-        
-        # Run find_releases again (should not download again)
         dollhouse_instance.find_releases(clean_db)
-        assert download_count[0] == 1  # Still 1, not 2
         
-        # Verify only one download record
-        cur.execute("SELECT COUNT(*) FROM downloads WHERE title = 'Breaking Bad' AND episode = 'S01E01'")
-        count = cur.fetchone()[0]
-        assert count == 1
+        db_cursor.execute("SELECT COUNT(*) FROM downloads d JOIN releases r ON r.id = d.release_id WHERE r.quality = '1080p'")
+        assert db_cursor.fetchone()[0] == count // 2
+        db_cursor.execute("SELECT COUNT(*) FROM downloads")
+        assert db_cursor.fetchone()[0] == count // 2
+
+
+def create_feed_items(*items, comment=None):
+    """Helper to build RSS <item> elements from (title, pubDate[, description]) tuples.
+    
+    Parsed with the same ElementTree implementation as DollHouse.get_feed
+    (lxml when installed), optionally with a comment node leading each item.
+    """
+    xml = "<rss><channel>"
+    for i, (title, pub_date, *description) in enumerate(items):
+        xml += "<item>"
+        if comment is not None:
+            xml += f"<!--{comment}-->"
+        xml += f"<title>{title}</title><category>TV</category>"
+        xml += f"<link>https://example.com/feed{i}</link><pubDate>{pub_date}</pubDate>"
+        if description:
+            xml += f"<description>{description[0]}</description>"
+        xml += "</item>"
+    xml += "</channel></rss>"
+    return dollhouse.ET.fromstring(xml).findall('channel/item')
+
+
+class TestParseFeed:
+    """Test RSS item parsing into shows and movies."""
+    
+    PUB_DATE = "Mon, 06 Jan 2025 10:00:00 +0000"
+    
+    def test_parse_episode(self, feed_dollhouse):
+        """Test splitting a SxxEyy title into title, episode and tags."""
+        shows, movies = feed_dollhouse.parse_feed(
+            create_feed_items(("Breaking Bad S01E02 1080p WEB-DL", self.PUB_DATE)))
+        
+        assert movies == []
+        assert len(shows) == 1
+        assert shows[0]['title'] == "Breaking Bad"
+        assert shows[0]['episode'] == "S01E02"
+        assert shows[0]['tags'] == "1080p WEB-DL"
+        assert shows[0]['quality'] == "1080p"
+        assert shows[0]['category'] == "TV"
+        assert shows[0]['link'] == "https://example.com/feed0"
+        assert isinstance(shows[0]['date'], datetime)
+    
+    def test_parse_dated_episode(self, feed_dollhouse):
+        """Test splitting a date-numbered title."""
+        shows, movies = feed_dollhouse.parse_feed(
+            create_feed_items(("The Daily Show 2025 01 06 720p HDTV", self.PUB_DATE)))
+        
+        assert shows[0]['title'] == "The Daily Show"
+        assert shows[0]['episode'] == "2025 01 06"
+        assert shows[0]['quality'] == "720p"
+    
+    def test_parse_movie(self, feed_dollhouse):
+        """Test that titles without an episode marker are movies."""
+        shows, movies = feed_dollhouse.parse_feed(
+            create_feed_items(("Some.Movie.2019.2160p.BluRay", self.PUB_DATE)))
+        
+        assert shows == []
+        assert len(movies) == 1
+        assert movies[0]['title'] == "Some.Movie.2019.2160p.BluRay"
+    
+    def test_parse_unknown_quality(self, feed_dollhouse):
+        """Test that tags without a known resolution get Unknown quality."""
+        shows, movies = feed_dollhouse.parse_feed(
+            create_feed_items(("Show S02E03 HDTV", self.PUB_DATE)))
+        
+        assert shows[0]['quality'] == "Unknown"
+    
+    def test_parse_quality_first_resolution_wins(self, feed_dollhouse):
+        """Test that the first resolution in the tags decides the quality."""
+        shows, movies = feed_dollhouse.parse_feed(
+            create_feed_items(("Show S01E01 2160p DV 720p-Sample", self.PUB_DATE)))
+        
+        assert shows[0]['quality'] == "2160p"
+    
+    def test_parse_added_date_fallback(self, feed_dollhouse):
+        """Test date parsing from description when pubDate is empty."""
+        shows, movies = feed_dollhouse.parse_feed(
+            create_feed_items(("Show S02E03 HDTV", "", "Name: x Added: 2025-01-05 09:08:07 Size: 1")))
+        
+        assert shows[0]['date'] == datetime(2025, 1, 5, 9, 8, 7)
+    
+    def test_parse_item_with_comment(self, feed_dollhouse):
+        """Test that comment nodes among an item's children are skipped."""
+        shows, movies = feed_dollhouse.parse_feed(
+            create_feed_items(("Show S02E03 1080p", self.PUB_DATE), comment=" mirror "))
+        
+        assert shows[0]['title'] == "Show"
+        assert shows[0]['link'] == "https://example.com/feed0"
+        assert shows[0]['quality'] == "1080p"
+    
+    @pytest.mark.skipif(dollhouse._XML_PARSER is None, reason="lxml not installed")
+    def test_feed_parser_does_not_expand_external_entities(self, tmp_path):
+        """Test that the feed parser leaves external entities unresolved."""
+        secret = tmp_path / "secret.txt"
+        secret.write_text("SECRET")
+        xml = (f'<?xml version="1.0"?><!DOCTYPE rss [<!ENTITY xxe SYSTEM "{secret.as_uri()}">]>'
+               '<rss><channel><item><title>&xxe;</title></item></channel></rss>')
+        
+        root = dollhouse.ET.parse(io.BytesIO(xml.encode()), dollhouse._XML_PARSER).getroot()
+        
+        assert b"SECRET" not in dollhouse.ET.tostring(root)
 
 
 class TestEdgeCases:
@@ -570,11 +739,18 @@ class TestEdgeCases:
             link="https://example.com/sunny"
         )
         release_id = dollhouse_instance.add_release(clean_db, show)
-        clean_db.commit()
         
         assert release_id is not None
         assert dollhouse_instance.check_if_show_exists(clean_db, "https://example.com/sunny") is True
     
+    def test_seed_releases_escapes_copy_specials(self, clean_db, db_cursor):
+        """Test that backslashes, tabs and newlines survive COPY seeding."""
+        tags = "1080p (WEB\\.DL|HDTV)\tx264\r\nREPACK"
+        seed_releases(clean_db, [create_sample_release(tags=tags, link=None)])
+        
+        db_cursor.execute("SELECT tags, link FROM releases")
+        assert db_cursor.fetchall() == [(tags, None)]
+    
     def test_unicode_in_title(self, dollhouse_instance, clean_db):
         """Test handling of unicode characters."""
         show = create_sample_release(
@@ -587,7 +763,6 @@ class TestEdgeCases:
         # Add download for exact unicode match
         download = ("Café René", "S01E01", release_id)
         dollhouse_instance.add_downloads(clean_db, download)
-        clean_db.commit()
         
         assert release_id is not None
         
@@ -596,5 +771,42 @@ class TestEdgeCases:
         assert result is False
 
 
+class TestQueryPlans:
+    """Test that case-insensitive lookups are served by the LOWER() indexes."""
+    
+    def explain(self, conn, sql, params):
+        cur = conn.cursor()
+        cur.execute("SET LOCAL enable_seqscan = off")
+        cur.execute("EXPLAIN " + sql, params)
+        plan = "\n".join(row[0] for row in cur.fetchall())
+        conn.rollback()
+        return plan
+    
+    def test_release_link_lookup_uses_index(self, clean_db):
+        """Test that link existence checks use idx_releases_link_lower."""
+        plan = self.explain(clean_db,
+            "SELECT 1 FROM releases WHERE LOWER(link) = LOWER(%s)", ("https://example.com/x",))
+        assert "idx_releases_link_lower" in plan
+    
+    def test_download_lookup_uses_index(self, clean_db):
+        """Test that download checks use idx_downloads_title_episode_lower."""
+        plan = self.explain(clean_db,
+            "SELECT 1 FROM downloads WHERE LOWER(title) = LOWER(%s) AND LOWER(episode) = LOWER(%s)",
+            ("Breaking Bad", "S01E01"))
+        assert "idx_downloads_title_episode_lower" in plan
+    
+    def test_phase1_creates_lookup_indexes(self, clean_db, db_cursor):
+        """Test that phase1_optimizations.sql adds the LOWER() indexes to a schema without them."""
+        schema = f"{TEST_SCHEMA}_phase1"
+        db_cursor.execute(f"CREATE SCHEMA {schema}")
+        db_cursor.execute(f"SET LOCAL search_path = {schema}")
+        db_cursor.execute(TABLES_SQL + read_phase1_sql())
+        
+        db_cursor.execute("SELECT indexname FROM pg_indexes WHERE schemaname = %s", (schema,))
+        indexes = {row[0] for row in db_cursor.fetchall()}
+        assert "idx_releases_link_lower" in indexes
+        assert "idx_downloads_title_episode_lower" in indexes
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])